@@ -7,7 +7,16 @@
 
 import os
 import re
+import json
+import time
+import hashlib
 import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+JOURNAL_NAME = ".3dm_merge_journal.json"
+MANIFEST_NAME = ".3dm_merge_manifest.json"
+HASH_INDEX_NAME = ".3dm_hash_index.json"
+MASTER_FOOTER = "; .ini generated by 3Dmigoto mods merger script"
 
 def safe_read_file(file_path):
     """
@@ -21,50 +30,351 @@ def safe_read_file(file_path):
         print(f"Error reading file {file_path}: {e}")
         return None
 
-def safe_write_file(file_path, content, max_retries=3):
+def safe_rename_file(old_path, new_path, max_retries=3):
     """
-    Safely write content to a file with retry mechanism.
+    Safely rename a file with retry mechanism.
     Returns True if successful, False otherwise.
     """
     for attempt in range(max_retries):
         try:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            os.rename(old_path, new_path)
             return True
-        except (IOError, OSError) as e:
-            print(f"Error writing to {file_path} (attempt {attempt + 1}/{max_retries}): {e}")
+        except OSError as e:
+            print(f"Error renaming {old_path} (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
                 input("Press ENTER to retry, or Ctrl+C to cancel...")
             else:
-                print(f"Failed to write {file_path} after {max_retries} attempts")
+                print(f"Failed to rename {old_path} after {max_retries} attempts")
     return False
 
-def safe_rename_file(old_path, new_path, max_retries=3):
+def retry_file_operation(operation, path, max_retries=3, delay=0.5):
     """
-    Safely rename a file with retry mechanism.
+    Run a file operation with an automatic retry mechanism.
+    Unlike safe_rename_file this never waits for input, so it is safe to use from worker threads.
     Returns True if successful, False otherwise.
     """
     for attempt in range(max_retries):
         try:
-            os.rename(old_path, new_path)
+            operation()
             return True
         except OSError as e:
-            print(f"Error renaming {old_path} (attempt {attempt + 1}/{max_retries}): {e}")
+            print(f"Error processing {path} (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
-                input("Press ENTER to retry, or Ctrl+C to cancel...")
+                time.sleep(delay * (attempt + 1))
             else:
-                print(f"Failed to rename {old_path} after {max_retries} attempts")
+                print(f"Failed to process {path} after {max_retries} attempts")
     return False
 
-def extract_character_name(ini_path):
+def write_json_file(file_path, data):
     """
-    Extract character name from the first TextureOverride section.
-    Returns the first capitalized word after TextureOverride.
+    Write a JSON file atomically, so an interrupted run never leaves a half-written journal or index behind.
     """
-    content = safe_read_file(ini_path)
+    temp_path = file_path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, file_path)
+
+def stage_file(final_path, temp_path, content):
+    """
+    Write content to the temp file of an output and flush it to disk.
+    """
+    def operation():
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+    return retry_file_operation(operation, final_path)
+
+def commit_staged_file(final_path, temp_path):
+    """
+    Move a staged temp file into place. Does nothing if it was already moved.
+    """
+    def operation():
+        if os.path.exists(temp_path):
+            os.replace(temp_path, final_path)
+    return retry_file_operation(operation, final_path)
+
+def commit_rename(old_path, new_path):
+    """
+    Rename a file as part of the commit phase.
+    Does nothing if it was already renamed, or if neither file exists anymore since there is nothing left to rename.
+    """
+    def operation():
+        if os.path.exists(old_path):
+            os.rename(old_path, new_path)
+    return retry_file_operation(operation, old_path)
+
+def commit_removal(path):
+    """
+    Remove a file as part of the commit phase. Does nothing if it was already removed.
+    """
+    def operation():
+        if os.path.exists(path):
+            os.remove(path)
+    return retry_file_operation(operation, path)
+
+def remove_staged_file(temp_path):
+    """
+    Remove a staged temp file left behind by an aborted commit.
+    """
+    def operation():
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+    return retry_file_operation(operation, temp_path)
+
+def apply_journal(journal, jobs):
+    """
+    Move every staged output into place and apply every rename and removal of a journal, in parallel.
+    All operations are idempotent, so this is also used to roll an interrupted commit forward.
+    Returns a journal holding only the operations that failed.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        writes = [(write, executor.submit(commit_staged_file, *write)) for write in journal['writes']]
+        renames = [(rename, executor.submit(commit_rename, *rename)) for rename in journal['renames']]
+        removals = [(path, executor.submit(commit_removal, path)) for path in journal.get('removals', [])]
+        return {
+            'state': 'committing',
+            'writes': [write for write, future in writes if not future.result()],
+            'renames': [rename for rename, future in renames if not future.result()],
+            'removals': [path for path, future in removals if not future.result()],
+        }
+
+def has_operations(journal):
+    """
+    Check whether a journal still holds any operation.
+    """
+    return bool(journal['writes'] or journal['renames'] or journal.get('removals'))
+
+def report_failed_operations(journal):
+    """
+    Print every operation of a journal of failed operations.
+    """
+    for final, _ in journal['writes']:
+        print(f"\tNot written: {final}")
+    for old, new in journal['renames']:
+        print(f"\tNot renamed: {old} -> {new}")
+    for path in journal.get('removals', []):
+        print(f"\tNot removed: {path}")
+
+def save_journal(journal_path, journal):
+    """
+    Write the journal with the automatic retry mechanism.
+    Returns True if successful, False otherwise.
+    """
+    return retry_file_operation(lambda: write_json_file(journal_path, journal), journal_path)
+
+def remove_journal(journal_path):
+    """
+    Remove the journal with the automatic retry mechanism.
+    Returns True if successful, False otherwise.
+    """
+    return retry_file_operation(lambda: os.remove(journal_path), journal_path)
+
+def commit_changes(root, writes, renames, jobs, removals=()):
+    """
+    Apply all output writes, renames and removals as a single transaction.
+    Outputs are first staged to temp files next to their destination, then moved into place together with the renames.
+    Each step is recorded in a journal in the root folder, so recover_journal can roll an interrupted run back or forward.
+    writes is a list of (path, content) tuples, renames a list of (old_path, new_path) tuples and removals a list of paths.
+    Returns True if successful, False otherwise.
+    """
+    journal_path = os.path.join(root, JOURNAL_NAME)
+    journal = {
+        'state': 'staging',
+        'writes': [[os.path.abspath(path), os.path.abspath(path) + ".tmp"] for path, _ in writes],
+        'renames': [[os.path.abspath(old), os.path.abspath(new)] for old, new in renames],
+        'removals': [os.path.abspath(path) for path in removals],
+    }
+    if not save_journal(journal_path, journal):
+        print("Failed to write the journal. No files were changed.")
+        return False
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        staged = [executor.submit(stage_file, final, temp, content)
+                  for (final, temp), (_, content) in zip(journal['writes'], writes)]
+        staged = [future.result() for future in staged]
+    if not all(staged):
+        print("Failed to stage all output files, rolling back. No files were changed.")
+        rollback_journal(journal, jobs)
+        if not remove_journal(journal_path):
+            print("Failed to remove the journal. It will be rolled back the next time the script runs.")
+        return False
+
+    journal['state'] = 'committing'
+    if not save_journal(journal_path, journal):
+        print("Failed to write the journal, rolling back. No files were changed.")
+        rollback_journal(journal, jobs)
+        return False
+    failed = apply_journal(journal, jobs)
+    if has_operations(failed):
+        print("Some operations could not be completed. They will be retried the next time the script runs:")
+        report_failed_operations(failed)
+        # Keep only the failed operations, so the next run does not repeat the ones that succeeded
+        save_journal(journal_path, failed)
+        return False
+
+    if not remove_journal(journal_path):
+        print("Failed to remove the journal. It will be rolled forward again the next time the script runs.")
+        return False
+    return True
+
+def rollback_journal(journal, jobs):
+    """
+    Remove every staged temp file of a journal that never reached the commit step.
+    """
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        for _, temp in journal['writes']:
+            executor.submit(remove_staged_file, temp)
+
+def recover_journal(root, jobs):
+    """
+    Finish or undo a merge that was interrupted during its commit phase.
+    A journal still in the staging state is rolled back, a journal in the committing state is rolled forward.
+    Operations that fail again are reported and dropped, so they cannot block later runs.
+    Returns True if there was nothing to recover or recovery succeeded, False otherwise.
+    """
+    journal_path = os.path.join(root, JOURNAL_NAME)
+    if not os.path.exists(journal_path):
+        return True
+
+    content = safe_read_file(journal_path)
     if not content:
-        return ""
+        return False
+    try:
+        journal = json.loads(content)
+        state = journal['state']
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"The journal {journal_path} is damaged: {e}")
+        return False
+
+    if state == 'committing':
+        print("Found an interrupted merge, rolling it forward...")
+        failed = apply_journal(journal, jobs)
+        if has_operations(failed):
+            print("Some operations of the interrupted merge failed again and were dropped:")
+            report_failed_operations(failed)
+    else:
+        print("Found an interrupted merge, rolling it back...")
+        rollback_journal(journal, jobs)
+
+    if not remove_journal(journal_path):
+        return False
+    print(" -> Recovery complete.")
+    return True
+
+def digest_text(content):
+    """
+    Returns the SHA-256 digest of a text file content as hex string.
+    """
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+def load_manifest(root):
+    """
+    Load the merge manifest of the root folder.
+    Returns the manifest as dict, with an empty merge list if there is none yet, or None if it is damaged.
+    """
+    manifest_path = os.path.join(root, MANIFEST_NAME)
+    if not os.path.exists(manifest_path):
+        return {'merges': {}}
+
+    content = safe_read_file(manifest_path)
+    if content is None:
+        return None
+    try:
+        manifest = json.loads(content)
+        if not isinstance(manifest['merges'], dict):
+            raise ValueError("'merges' is not an object")
+    except (ValueError, KeyError, TypeError) as e:
+        print(f"The manifest {manifest_path} is damaged: {e}")
+        return None
+    return manifest
+
+def relative_path(root, path):
+    """
+    Returns path relative to the root folder, as stored in the manifest.
+    """
+    return os.path.relpath(os.path.abspath(path), os.path.abspath(root))
+
+def get_merge_options(args):
+    """
+    Returns the options that decide how a merge renders its master and namespace files.
+    """
+    return {
+        'active': args.active,
+        'inline': args.inline,
+        'inline_threshold': args.inline_threshold,
+        'minify': args.minify,
+    }
+
+def build_merge_record(root, character_name, options, namespace_files, writes, renames, previous=None):
+    """
+    Build the manifest record of a merge: its render options, its namespaces, the files it disabled
+    and the outputs it created with their digests.
+    namespace_files maps each namespace to its (source_path, output_path) tuple.
+    If previous is the record of an earlier merge to the same master file, its disabled files and outputs are kept,
+    so -e still undoes them.
+    Paths are stored relative to the root folder.
+    """
+    merge = {
+        'character': character_name,
+        'options': options,
+        'namespaces': {namespace: {'source': relative_path(root, source), 'output': relative_path(root, output)}
+                       for namespace, (source, output) in namespace_files.items()},
+        'disabled': [[relative_path(root, old), relative_path(root, new)] for old, new in renames],
+        'outputs': {relative_path(root, path): digest_text(content) for path, content in writes},
+    }
+    if previous:
+        merge['disabled'] = [pair for pair in previous['disabled'] if pair not in merge['disabled']] + merge['disabled']
+        merge['outputs'] = {**previous['outputs'], **merge['outputs']}
+    return merge
+
+def update_manifest(root, manifest, master_name, merge):
+    """
+    Store the record of a merge in the loaded manifest.
+    Returns (manifest_path, content) tuple.
+    """
+    manifest['merges'][relative_path(root, master_name)] = merge
+    return os.path.join(root, MANIFEST_NAME), json.dumps(manifest, indent=2)
 
+def enable_from_manifest(root, manifest, jobs):
+    """
+    Undo every merge recorded in the loaded manifest in one batched pass, without scanning the filesystem.
+    Disabled files are renamed back and outputs are removed, unless they were modified after the merge.
+    Returns True if successful, False otherwise.
+    """
+    renames = []
+    removals = [os.path.join(root, MANIFEST_NAME)]
+    for master_name, merge in manifest['merges'].items():
+        print(f"Undoing merge {master_name}...")
+        for original, disabled in merge['disabled']:
+            disabled_path = os.path.join(root, disabled)
+            if not os.path.exists(disabled_path):
+                print(f"\tSkipping {disabled_path}, it no longer exists")
+                continue
+            renames.append((disabled_path, os.path.join(root, original)))
+        for output, digest in merge['outputs'].items():
+            output_path = os.path.join(root, output)
+            if not os.path.exists(output_path):
+                continue
+            content = safe_read_file(output_path)
+            if content is not None and digest_text(content) == digest:
+                removals.append(output_path)
+            else:
+                print(f"\tKeeping {output_path}, it was modified after the merge")
+
+    if not commit_changes(root, [], renames, jobs, removals):
+        return False
+    for disabled_path, _ in renames:
+        print(f"\tRe-enabled {disabled_path}")
+    return True
+
+def extract_character_name(content):
+    """
+    Extract character name from the first TextureOverride section of ini content.
+    Returns the first capitalized word after TextureOverride.
+    """
     for line in content.splitlines():
         stripped_line = line.strip()
         if stripped_line.lower().startswith('[textureoverride'):
@@ -77,17 +387,41 @@ def extract_character_name(ini_path):
             break
     return ""
 
-def process_ini_content(original_content, character_name, namespace, remove_hash=False):
+def minify_line(line):
+    """
+    Normalize one ini line for minified output.
+    Strips surrounding whitespace, puts single spaces around the assignment and lowercases plain keys.
+    Values are kept as they are, since they may contain file names.
+    Returns the normalized line, or None for comments and blank lines.
+    """
+    stripped = line.strip()
+    if not stripped or stripped.startswith(';'):
+        return None
+    if stripped.startswith('['):
+        return f"{stripped}\n"
+
+    match = re.match(r'([^=<>!]+?)\s*=(?!=)\s*(.*)$', stripped)
+    if not match:
+        return f"{' '.join(stripped.split())}\n"
+    key, val = ' '.join(match.group(1).split()), match.group(2)
+    if re.fullmatch(r'[A-Za-z_][\w\-]*', key):
+        key = key.lower()
+    return f"{key} = {val}\n"
+
+def process_ini_content(original_content, remove_hash=False, minify=False, source_map=None):
     """
     Process ini content with various transformations.
+    The namespace line is added by build_namespace_ini, so the result does not depend on the merge order.
+    With minify, comments and blank lines are dropped and every line is normalized by minify_line.
+    If source_map is a list, the original line number of every emitted line is appended to it.
     Returns processed content as string.
     """
-    lines = [f"namespace = {character_name}\\{namespace}\n"]
+    lines = []
 
     # Process each line
     inside_override_section = False
 
-    for line in original_content.splitlines(keepends=True):
+    for line_number, line in enumerate(original_content.splitlines(keepends=True), 1):
         stripped = line.strip().lower()
         is_texture_override = stripped.startswith('[textureoverride')
         is_shader_override = stripped.startswith('[shaderoverride')
@@ -105,89 +439,243 @@ def process_ini_content(original_content, character_name, namespace, remove_hash
             any(stripped.startswith(key) and '=' in stripped for key in skip_keys)):
             continue
 
+        if minify:
+            line = minify_line(line)
+            if line is None:
+                continue
+
         # Convert Override to CommandList
         if is_texture_override or is_shader_override:
             original_section_name = line.strip()[1:-1]
             lines.append(f"[CommandList{original_section_name}]\n")
         else:
             lines.append(line)
+        if source_map is not None:
+            source_map.append(line_number)
 
     return ''.join(lines)
 
-def write_namespace_ini(original_content, namespace, original_path, character_name):
+def prepare_mod(ini_path, minify=False):
     """
-    Write namespace ini file with hash lines removed.
+    Read a mod .ini file and do all processing that does not depend on its namespace or the character name.
+    Runs in the background while the user answers the prompts.
+    Returns a dict with the original content, the processed namespace body, its source map and the parsed
+    override sections, or None if failed.
     """
-    processed_content = process_ini_content(original_content, character_name, namespace, remove_hash=True)
+    content = safe_read_file(ini_path)
+    if not content:
+        return None
+    source_map = []
+    return {
+        'content': content,
+        'body': process_ini_content(content, remove_hash=True, minify=minify, source_map=source_map),
+        'source_map': source_map,
+        'sections': parse_override_sections(content),
+    }
+
+def build_namespace_ini(mod, namespace, original_path, character_name):
+    """
+    Build namespace ini file with hash lines removed from a prepared mod.
+    Returns (output_path, content) tuple.
+    """
+    processed_content = f"namespace = {character_name}\\{namespace}\n" + mod['body']
 
     output_dir = os.path.dirname(original_path)
     filename = f"{character_name}.namespace"
     output_path = os.path.join(output_dir, f"{filename}.ini")
 
-    if safe_write_file(output_path, processed_content):
-        print(f" -> Saved namespace file to {output_path}")
-        return output_path
-    else:
+    return output_path, processed_content
+
+def get_disabled_path(ini_path):
+    """
+    Returns the path an original .ini file is renamed to when it is disabled.
+    """
+    return os.path.join(os.path.dirname(ini_path), "DISABLED" + os.path.basename(ini_path))
+
+def build_source_map(mod, original_path, output_path, disabled_path=None):
+    """
+    Build the source map of a namespace ini file, so every emitted line can be traced back to the original file.
+    source is the original file relative to the namespace ini, disabled_source the name it has while the merge
+    keeps it disabled, or None if it stays enabled.
+    lines holds the original line number of each line of the namespace ini, 0 for the generated namespace line.
+    Returns (map_path, content) tuple.
+    """
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    source_map = {
+        'source': os.path.relpath(os.path.abspath(original_path), output_dir),
+        'disabled_source': os.path.relpath(os.path.abspath(disabled_path), output_dir) if disabled_path else None,
+        'lines': [0] + mod['source_map'],
+    }
+    return f"{output_path}.map", json.dumps(source_map)
+
+def qualify_references(command, character_name, namespace, declarations):
+    """
+    Qualify the Resource/CommandList/CustomShader and $variable references of a namespaced command,
+    so the command keeps its meaning when placed directly in the master file.
+    Only names the mod declares itself are qualified, an unqualified reference to anything else may resolve
+    to a global name that only the namespaced file can see.
+    Returns the qualified command, or None if it references a name the mod does not declare.
+    """
+    prefix = f"{character_name}\\{namespace}\\"
+    section_pattern = r'\b(Resource|CommandList|CustomShader)(?!\\)(\w+)'
+    variable_pattern = r'\$(?!\\)(\w+)'
+    if (any(m.group(0).lower() not in declarations['sections'] for m in re.finditer(section_pattern, command, re.IGNORECASE)) or
+        any(m.group(1).lower() not in declarations['variables'] for m in re.finditer(variable_pattern, command))):
         return None
 
+    command = re.sub(section_pattern, lambda m: f"{m.group(1)}\\{prefix}{m.group(2)}", command, flags=re.IGNORECASE)
+    command = re.sub(variable_pattern, lambda m: f"$\\{prefix}{m.group(1)}", command)
+    return command
+
+def can_inline(body, threshold):
+    """
+    Check whether an override body is short enough to be placed directly in its master branch.
+    Bodies declaring local variables keep their own CommandList scope.
+    """
+    if len(body) > threshold:
+        return False
+    return not any(command.lower().startswith('local ') for command in body)
+
+def override_key(section_data):
+    """
+    Returns the (hash, index, index_type, priority) key master overrides are grouped by.
+    """
+    # Determine index type and value
+    if 'match_first_index' in section_data:
+        index = section_data['match_first_index']
+        index_type = 'match_first_index'
+    elif 'filter_index' in section_data:
+        index = section_data['filter_index']
+        index_type = 'filter_index'
+    else:
+        index = '-1'
+        index_type = None
+
+    if 'match_priority' in section_data:
+        priority = section_data['match_priority']
+    else:
+        priority = None
+
+    return (section_data['hash'], index, index_type, priority)
+
+def parse_override_sections(original_content):
+    """
+    Parse the override sections of an original ini content.
+    The namespace of each section is assigned later, when the merge order is known.
+    Every section_data shares the declarations of the mod: the lowercase names of its sections, as they appear
+    in the namespace ini, and of its [Constants] variables.
+    Returns a list of (key, section_data) tuples for every section with a hash.
+    """
+    sections = []
+    declarations = {'sections': set(), 'variables': set()}
+    current_section_name = ''
+    current_section_data = {}
+    # Add a sentinel section header to trigger processing for the last real section
+    for line in original_content.split('\n') + ['[EOF]']:
+        stripped = line.strip()
+        if not stripped or stripped.startswith(';') or stripped.startswith('namespace'):
+            continue
+
+        if stripped.startswith('[') and stripped.endswith(']'):
+            # A new section header triggers processing of the previous section.
+            if current_section_data.get('hash'):
+                sections.append((override_key(current_section_data), current_section_data))
+
+            # Reset for the new section.
+            section_name = stripped[1:-1]
+            is_override = section_name.lower().startswith(('textureoverride', 'shaderoverride'))
+            original_section_name = section_name if is_override else ''
+            current_section_name = section_name.lower()
+            declarations['sections'].add(f"commandlist{current_section_name}" if is_override else current_section_name)
+            current_section_data = {'original_section_name': original_section_name, 'body': []}
+
+        elif current_section_name == 'constants':
+            match = re.match(r'(?:global\s+)?(?:persist\s+)?\$(\w+)', stripped, re.IGNORECASE)
+            if match:
+                declarations['variables'].add(match.group(1).lower())
+
+        elif '=' in stripped:
+            key, val = stripped.split('=', 1)
+            key, val = key.strip(), val.strip()
+            if key.lower() in ['hash', 'match_first_index', 'filter_index', 'match_priority']:
+                current_section_data[key.lower()] = val
+            elif key.lower() != 'allow_duplicate_hash':
+                current_section_data['body'].append(stripped)
+
+        else:
+            current_section_data['body'].append(stripped)
+
+    for _, section_data in sections:
+        section_data['declarations'] = declarations
+    return sections
+
+def render_override_branch(command_data, condition, args, character_name):
+    """
+    Render the $swapvar branch running one namespaced override.
+    Returns a list of lines.
+    """
+    namespace = command_data['namespace']
+    lines = [f"{condition} $swapvar == {namespace}"]
+    inlined = None
+    if args.inline and can_inline(command_data['body'], args.inline_threshold):
+        inlined = [qualify_references(command, character_name, namespace, command_data['declarations'])
+                   for command in command_data['body']]
+    if inlined is not None and None not in inlined:
+        for command in inlined:
+            lines.append(f"\t{command}")
+    else:
+        run_target = f"CommandList\\{character_name}\\{namespace}\\{command_data['original_section_name']}"
+        lines.append(f"\trun = {run_target}")
+    return lines
+
+def render_master_section(key, commands, args, character_name):
+    """
+    Render a master override section with one branch per namespace overriding the key.
+    Returns a list of lines.
+    """
+    hash_val, index, index_type, priority = key
+    sorted_commands = sorted(commands, key=lambda x: int(x['namespace']))
+
+    original_section_name = sorted_commands[0]['original_section_name']
+    lines = [f"[{original_section_name}]", f"hash = {hash_val}"]
+    if index != '-1' and index_type:
+        lines.append(f"{index_type} = {index}")
+    if priority:
+        lines.append(f"match_priority = {priority}")
+    if ('ShaderOverride').lower() in original_section_name.lower():
+        lines.append("allow_duplicate_hash = overrule")
+
+    for i, command_data in enumerate(sorted_commands):
+        condition = "if" if i == 0 else "else if"
+        lines.extend(render_override_branch(command_data, condition, args, character_name))
+
+    if commands:
+        lines.append("endif")
+
+    if args.active and "position" in original_section_name.lower():
+         lines.append("$active = 1")
+    lines.append("\n")
+    return lines
+
 def create_master_ini(file_data, args, character_name):
     """
-    Creates the master ini file by grouping command lists by (hash, index).
-    Uses file_data (list of (path, content) tuples) for processing.
+    Creates the master ini content by grouping command lists by (hash, index).
+    Uses file_data (list of (path, mod) tuples of prepared mods) for processing.
+    The merge order is only applied here, by assigning each mod its namespace.
+    Returns master ini content as string.
     """
     print("\nCreating master .ini file...")
 
     command_groups = {}
-    order_map = {str(i): i for i in range(len(file_data))}
 
-    for i, (ini_path, original_content) in enumerate(file_data):
+    for i, (ini_path, mod) in enumerate(file_data):
         namespace = str(i)
         print(f"Processing {ini_path} with namespace '{namespace}'...")
 
-        processed_content = process_ini_content(original_content, character_name, namespace, remove_hash=False)
-        print(f" -> Processed {ini_path} in memory")
-
-        current_section_data = {}
-        # Add a sentinel section header to trigger processing for the last real section
-        for line in processed_content.split('\n') + ['[EOF]']:
-            stripped = line.strip()
-            if not stripped or stripped.startswith(';') or stripped.startswith('namespace'):
-                continue
-
-            if stripped.startswith('[') and stripped.endswith(']'):
-                # A new section header triggers processing of the previous section.
-                if current_section_data.get('hash'):
-                    # Determine index type and value
-                    if 'match_first_index' in current_section_data:
-                        index = current_section_data['match_first_index']
-                        index_type = 'match_first_index'
-                    elif 'filter_index' in current_section_data:
-                        index = current_section_data['filter_index']
-                        index_type = 'filter_index'
-                    else:
-                        index = '-1'
-                        index_type = None
-
-                    if 'match_priority' in current_section_data:
-                        priority = current_section_data['match_priority']
-                    else:
-                        priority = None
-
-                    key = (current_section_data['hash'], index, index_type, priority)
-                    if key not in command_groups:
-                        command_groups[key] = []
-                    command_groups[key].append(current_section_data)
-
-                # Reset for the new section.
-                cmd_name = stripped[1:-1]
-                original_section_name = cmd_name[len('CommandList'):] if cmd_name.lower().startswith('commandlist') else ''
-                current_section_data = {'namespace': namespace, 'original_section_name': original_section_name}
-
-            elif '=' in stripped:
-                key, val = stripped.split('=', 1)
-                key, val = key.strip(), val.strip()
-                if key.lower() in ['hash', 'match_first_index', 'filter_index', 'match_priority']:
-                    current_section_data[key.lower()] = val
+        for key, section_data in mod['sections']:
+            if key not in command_groups:
+                command_groups[key] = []
+            command_groups[key].append(dict(section_data, namespace=namespace))
 
     ini_content = []
     # Extract paths from file_data for the comment
@@ -213,40 +701,220 @@ def create_master_ini(file_data, args, character_name):
         ini_content.append("post $active = 0\n\n")
 
     ini_content.append("; Master Overrides\n")
-    for (hash_val, index, index_type, priority), commands in command_groups.items():
-        sorted_commands = sorted(commands, key=lambda x: order_map.get(x['namespace'], 999))
-
-        original_section_name = sorted_commands[0]['original_section_name']
-        ini_content.append(f"[{original_section_name}]")
-        ini_content.append(f"hash = {hash_val}")
-        if index != '-1' and index_type:
-            ini_content.append(f"{index_type} = {index}")
-        if priority:
-            ini_content.append(f"match_priority = {priority}")
-        if ('ShaderOverride').lower() in original_section_name.lower():
-            ini_content.append("allow_duplicate_hash = overrule")
-
-        for i, command_data in enumerate(sorted_commands):
-            mod_index = order_map.get(command_data['namespace'])
-            if mod_index is not None:
-                condition = "if" if i == 0 else "else if"
-                run_target = f"CommandList\\{character_name}\\{command_data['namespace']}\\{command_data['original_section_name']}"
-                ini_content.append(f"{condition} $swapvar == {mod_index}")
-                ini_content.append(f"\trun = {run_target}")
-
-        if commands:
-            ini_content.append("endif")
-
-        if args.active and "position" in original_section_name.lower():
-             ini_content.append("$active = 1")
-        ini_content.append("\n")
-
-    ini_content.append("; .ini generated by 3Dmigoto mods merger script\n")
+    for key, commands in command_groups.items():
+        ini_content.extend(render_master_section(key, commands, args, character_name))
+
+    ini_content.append(f"{MASTER_FOOTER}\n")
     ini_content.append("; If you have any issues or find any bugs, please open a ticket at https://github.com/Qian23333/3Dmigoto-mods-merger\n")
 
-    content = "\n".join(ini_content)
-    if safe_write_file(args.name, content):
-        print(f"Master file '{args.name}' created successfully.")
+    return "\n".join(ini_content)
+
+def find_master_sections(lines):
+    """
+    Locate the override sections of master ini lines, up to the generated footer.
+    Returns a dict mapping each override key to the (start, end) line range of its section.
+    """
+    footer = next((n for n, line in enumerate(lines) if line.startswith(MASTER_FOOTER)), len(lines))
+    sections = {}
+    start = None
+    section_data = {}
+    for n, line in enumerate(lines[:footer] + ['[EOF]']):
+        stripped = line.strip()
+        if stripped.startswith('[') and stripped.endswith(']'):
+            if section_data.get('hash'):
+                sections[override_key(section_data)] = (start, n)
+            start = n
+            section_data = {}
+        elif '=' in stripped and not stripped.startswith(';'):
+            key, val = stripped.split('=', 1)
+            key, val = key.strip().lower(), val.strip()
+            if key in ['hash', 'match_first_index', 'filter_index', 'match_priority']:
+                section_data[key] = val
+    return sections
+
+def find_master_branches(lines, start, end):
+    """
+    Locate the $swapvar branches of a master override section.
+    Returns (branches, endif) where branches maps each namespace to the (start, end) line range of its branch
+    and endif is the line of the closing endif, or None if the section has no branches.
+    """
+    branches = {}
+    depth = 0
+    current = None
+    for n in range(start + 1, end):
+        stripped = lines[n].strip().lower()
+        match = re.match(r'(?:if|else if|elif)\s+\$swapvar\s*==\s*(\d+)$', stripped)
+        if match and (depth == 0 or (depth == 1 and not stripped.startswith('if'))):
+            if current is not None:
+                branches[current] = (branches[current][0], n)
+            current = match.group(1)
+            branches[current] = (n, None)
+            depth = 1
+        elif stripped.startswith('if '):
+            depth += 1
+        elif stripped == 'endif':
+            depth -= 1
+            if depth == 0:
+                if current is not None:
+                    branches[current] = (branches[current][0], n)
+                return branches, n
+    return branches, None
+
+def set_master_header(lines, merge, root):
+    """
+    Update the merged mod comment, the default $swapvar and the $swapvar cycle list of master ini lines
+    to the namespaces of a merge.
+    """
+    namespaces = sorted(merge['namespaces'], key=int)
+    sources = [os.path.join(root, merge['namespaces'][namespace]['source']) for namespace in namespaces]
+    for n, line in enumerate(lines):
+        if line.startswith('; Merged Mod:'):
+            lines[n] = f"; Merged Mod: {', '.join(sources)}"
+        elif re.match(r'\$swapvar\s*=', line.strip()):
+            lines[n] = f"$swapvar = {','.join(namespaces)}"
+        elif re.match(r'global\s+persist\s+\$swapvar\s*=', line.strip()):
+            lines[n] = f"global persist $swapvar = {namespaces[0]}"
+
+def add_to_merge(args, manifest, merge, ini_path):
+    """
+    Append a new namespace for one mod to an existing merged output.
+    The master ini is patched in place and only the new namespace ini is written.
+    The new namespace is rendered with the options recorded for the merge, so it matches the existing output.
+    Returns True if successful, False otherwise.
+    """
+    args = argparse.Namespace(**{**vars(args), **merge.get('options', {})})
+    master_content = safe_read_file(args.name)
+    mod = prepare_mod(ini_path, args.minify)
+    if not master_content or not mod:
+        return False
+
+    character_name = merge['character']
+    namespace = str(max(int(x) for x in merge['namespaces']) + 1)
+    print(f"Processing {ini_path} with namespace '{namespace}'...")
+
+    lines = master_content.split('\n')
+    sections = find_master_sections(lines)
+
+    # Collect insertions first and apply them bottom-up, so earlier line numbers stay valid
+    insertions = []
+    new_groups = {}
+    for key, section_data in mod['sections']:
+        section_data = dict(section_data, namespace=namespace)
+        if key in sections:
+            _, endif = find_master_branches(lines, *sections[key])
+            if endif is not None:
+                insertions.append((endif, render_override_branch(section_data, "else if", args, character_name)))
+                continue
+        if key not in new_groups:
+            new_groups[key] = []
+        new_groups[key].append(section_data)
+
+    footer = next((n for n, line in enumerate(lines) if line.startswith(MASTER_FOOTER)), len(lines))
+    new_sections = []
+    for key, commands in new_groups.items():
+        new_sections.extend(render_master_section(key, commands, args, character_name))
+    insertions.append((footer, new_sections))
+
+    for position, new_lines in sorted(insertions, key=lambda x: x[0], reverse=True):
+        lines[position:position] = new_lines
+
+    output_path, namespace_content = build_namespace_ini(mod, namespace, ini_path, character_name)
+    merge['namespaces'][namespace] = {'source': relative_path(args.root, ini_path), 'output': relative_path(args.root, output_path)}
+    set_master_header(lines, merge, args.root)
+    master_content = '\n'.join(lines)
+
+    writes = [(args.name, master_content), (output_path, namespace_content)]
+    if args.minify:
+        writes.append(build_source_map(mod, ini_path, output_path, None if args.store else get_disabled_path(ini_path)))
+    renames = []
+    if not args.store:
+        disabled_name = get_disabled_path(ini_path)
+        renames.append((ini_path, disabled_name))
+        merge['disabled'].append([relative_path(args.root, ini_path), relative_path(args.root, disabled_name)])
+    for path, content in writes:
+        merge['outputs'][relative_path(args.root, path)] = digest_text(content)
+    writes.append(update_manifest(args.root, manifest, args.name, merge))
+
+    if not commit_changes(args.root, writes, renames, args.jobs):
+        return False
+
+    print(f"Master file '{args.name}' updated successfully.")
+    print(f" -> Saved namespace file to {output_path}")
+    for original_path, _ in renames:
+        print(f" -> Disabled {original_path}")
+    return True
+
+def remove_from_merge(args, manifest, merge, namespace):
+    """
+    Retire one namespace from an existing merged output.
+    Its branches are removed from the master ini in place, its namespace ini is removed and its original ini is re-enabled.
+    Returns True if successful, False otherwise.
+    """
+    if namespace not in merge['namespaces']:
+        print(f"Namespace '{namespace}' is not part of {args.name}.")
+        return False
+    if len(merge['namespaces']) == 1:
+        print("Cannot remove the last namespace of a merge, use the -e flag instead.")
+        return False
+
+    master_content = safe_read_file(args.name)
+    if not master_content:
+        return False
+
+    lines = master_content.split('\n')
+    sections = find_master_sections(lines)
+    # Remove bottom-up, so earlier line numbers stay valid
+    for start, end in sorted(sections.values(), reverse=True):
+        branches, _ = find_master_branches(lines, start, end)
+        if namespace not in branches:
+            continue
+        if len(branches) == 1:
+            del lines[start:end]
+            continue
+        branch_start, branch_end = branches[namespace]
+        del lines[branch_start:branch_end]
+        if branch_start == min(start for start, _ in branches.values()):
+            # The next branch becomes the first one
+            lines[branch_start] = re.sub(r'^(\s*)(?:else if|elif)\b', r'\1if', lines[branch_start])
+
+    entry = merge['namespaces'].pop(namespace)
+    set_master_header(lines, merge, args.root)
+    master_content = '\n'.join(lines)
+    merge['outputs'][relative_path(args.root, args.name)] = digest_text(master_content)
+
+    renames = []
+    for original, disabled in merge['disabled']:
+        if original != entry['source']:
+            continue
+        disabled_path = os.path.join(args.root, disabled)
+        if not os.path.exists(disabled_path):
+            print(f"\tSkipping {disabled_path}, it no longer exists")
+            continue
+        renames.append((disabled_path, os.path.join(args.root, original)))
+    merge['disabled'] = [pair for pair in merge['disabled'] if pair[0] != entry['source']]
+
+    removals = []
+    for output in [entry['output'], f"{entry['output']}.map"]:
+        if output not in merge['outputs']:
+            continue
+        output_path = os.path.join(args.root, output)
+        digest = merge['outputs'].pop(output)
+        content = safe_read_file(output_path) if os.path.exists(output_path) else None
+        if content is not None and digest_text(content) == digest:
+            removals.append(output_path)
+        elif content is not None:
+            print(f"\tKeeping {output_path}, it was modified after the merge")
+
+    writes = [(args.name, master_content), update_manifest(args.root, manifest, args.name, merge)]
+    if not commit_changes(args.root, writes, renames, args.jobs, removals):
+        return False
+
+    print(f"Master file '{args.name}' updated successfully.")
+    for disabled_path, _ in renames:
+        print(f"\tRe-enabled {disabled_path}")
+    print(f"Note: if namespace '{namespace}' was the selected mod in game, its persisted $swapvar matches no mod anymore. "
+          "Press the cycle key once to select another mod.")
+    return True
 
 def collect_ini(path, ignore):
     ini_files = []
@@ -262,6 +930,128 @@ def collect_ini(path, ignore):
                 ini_files.append(os.path.join(root, file))
     return ini_files
 
+def collect_active_ini(path):
+    """
+    Collect every enabled .ini file under path, including merged and namespace files.
+    """
+    ini_files = []
+    for root, _, files in os.walk(path):
+        if "disabled" in root.lower():
+            continue
+        for file in files:
+            if "disabled" not in file.lower() and os.path.splitext(file)[1] == ".ini":
+                ini_files.append(os.path.join(root, file))
+    return ini_files
+
+def index_ini_file(ini_path, stat):
+    """
+    Build the hash index entry of one .ini file.
+    Returns a dict with the file mtime, size and the (hash, index, index_type, priority, section) of each override.
+    Files that cannot be read get an empty override list, so they are only reported again once they change.
+    """
+    content = safe_read_file(ini_path)
+    overrides = []
+    if content is not None:
+        overrides = [[hash_val.lower(), index, index_type, priority, section_data['original_section_name']]
+                     for (hash_val, index, index_type, priority), section_data in parse_override_sections(content)]
+    return {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'overrides': overrides}
+
+def update_hash_index(mods_root, jobs):
+    """
+    Load the persistent hash index of the Mods folder and bring it up to date.
+    Only files whose mtime or size changed since the last run are parsed again, files that were removed or disabled are dropped.
+    Returns the index as dict mapping each .ini path, relative to the Mods folder, to its entry.
+    """
+    index_path = os.path.join(mods_root, HASH_INDEX_NAME)
+    index = {}
+    if os.path.exists(index_path):
+        content = safe_read_file(index_path)
+        try:
+            index = json.loads(content)['files']
+            if not isinstance(index, dict):
+                raise ValueError("'files' is not an object")
+        except (ValueError, KeyError, TypeError) as e:
+            # The index is only a cache, rebuild it from scratch
+            print(f"The hash index {index_path} is damaged, rebuilding it: {e}")
+            index = {}
+
+    files = {}
+    stale = []
+    for ini_path in collect_active_ini(mods_root):
+        try:
+            stat = os.stat(ini_path)
+        except OSError:
+            continue
+        entry = index.get(relative_path(mods_root, ini_path))
+        if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            files[relative_path(mods_root, ini_path)] = entry
+        else:
+            stale.append((ini_path, stat))
+
+    with ThreadPoolExecutor(max_workers=jobs) as executor:
+        entries = [executor.submit(index_ini_file, ini_path, stat) for ini_path, stat in stale]
+        for (ini_path, _), entry in zip(stale, entries):
+            files[relative_path(mods_root, ini_path)] = entry.result()
+
+    if stale or len(files) != len(index):
+        try:
+            write_json_file(index_path, {'files': files})
+        except OSError as e:
+            print(f"Error writing hash index {index_path}: {e}")
+    return files
+
+def build_override_map(index, exclude=()):
+    """
+    Invert the hash index, leaving out the files in exclude.
+    Returns a dict mapping each (hash, index, index_type, priority) key to the list of (path, section) overriding it.
+    """
+    override_map = {}
+    for path, entry in index.items():
+        if path in exclude:
+            continue
+        for hash_val, index_val, index_type, priority, section in entry['overrides']:
+            key = (hash_val, index_val, index_type, priority)
+            if key not in override_map:
+                override_map[key] = []
+            override_map[key].append((path, section))
+    return override_map
+
+def report_merge_conflicts(index, file_data, exclude):
+    """
+    Report the overrides of the mods being merged that other active mods also override.
+    Returns the number of conflicting overrides.
+    """
+    override_map = build_override_map(index, exclude)
+    conflicts = 0
+    reported = set()
+    for ini_path, mod in file_data:
+        for (hash_val, index_val, index_type, priority), section_data in mod['sections']:
+            key = (hash_val.lower(), index_val, index_type, priority)
+            if key not in override_map or key in reported:
+                continue
+            reported.add(key)
+            conflicts += 1
+            print(f" -> [{section_data['original_section_name']}] in {ini_path} is also overridden by:")
+            for path, section in override_map[key]:
+                print(f"\t{path} [{section}]")
+    return conflicts
+
+def report_duplicate_overrides(index):
+    """
+    Report every override key that more than one section across the Mods folder overrides.
+    Returns the number of duplicate override keys.
+    """
+    duplicates = 0
+    for (hash_val, index_val, index_type, priority), overrides in build_override_map(index).items():
+        if len(overrides) < 2:
+            continue
+        duplicates += 1
+        index_text = f", {index_type} = {index_val}" if index_type else ""
+        print(f" -> hash = {hash_val}{index_text} is overridden {len(overrides)} times:")
+        for path, section in overrides:
+            print(f"\t{path} [{section}]")
+    return duplicates
+
 def enable_ini(path):
     """
     Recursively finds and re-enables .ini files.
@@ -310,6 +1100,18 @@ def get_user_order(ini_files):
             choice = input()
     return ini_files
 
+def positive_int(value):
+    """
+    Argument type for options that need an integer of at least 1.
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid int value: '{value}'")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1: '{value}'")
+    return number
+
 def main():
     parser = argparse.ArgumentParser(description="Generates a merged mod from several mod folders using a namespace approach.")
     parser.add_argument("-r", "--root", type=str, default=".", help="Location to use to create mod")
@@ -319,43 +1121,96 @@ def main():
     parser.add_argument("-k", "--key", type=str, default="", help="Key to press to switch mods")
     parser.add_argument("-b", "--back_key", type=str, default="", help="Key to press to switch back to previous mod")
     parser.add_argument("-a", "--active", action="store_true", default=True, help="Only active character gets swapped when swapping)")
+    parser.add_argument("-i", "--inline", action="store_true", help="Place short override bodies directly in the master file instead of running a CommandList")
+    parser.add_argument("--inline_threshold", type=int, default=8, help="Maximum number of commands an override body may have to be inlined")
+    parser.add_argument("-m", "--minify", action="store_true", help="Strip comments and blank lines from namespace .ini files and write a source map next to them")
+    parser.add_argument("--add", type=str, default="", help="Add the mod of this .ini file to an existing merged mod")
+    parser.add_argument("--remove", type=str, default="", help="Remove the mod with this namespace from an existing merged mod")
+    parser.add_argument("--mods_root", type=str, default="", help="Mods folder to check for conflicting overrides during the merge")
+    parser.add_argument("-c", "--conflicts", action="store_true", help="Report duplicate overrides across the Mods folder and exit")
+    parser.add_argument("-j", "--jobs", type=positive_int, default=8, help="Number of file operations to run in parallel")
 
     args = parser.parse_args()
 
     print("\n3Dmigoto Mods Merger Script (Namespace Edition)\n")
 
+    if not recover_journal(args.root, args.jobs):
+        print("Could not recover the interrupted merge, exiting...")
+        return
+
     if args.enable:
         print("Re-enabling all .ini files...")
-        enable_ini(args.root)
+        manifest = load_manifest(args.root)
+        if manifest is None:
+            # Move the damaged manifest aside, the directory walk below re-enables everything it recorded
+            manifest_path = os.path.join(args.root, MANIFEST_NAME)
+            if not safe_rename_file(manifest_path, manifest_path + ".damaged"):
+                return
+            print(f"Moved it to {manifest_path}.damaged, re-enabling by scanning the folders instead.")
+            enable_ini(args.root)
+        elif not manifest['merges']:
+            enable_ini(args.root)
+        elif not enable_from_manifest(args.root, manifest, args.jobs):
+            print("Failed to re-enable the files of the manifest, exiting...")
+            return
         print("Re-enabling complete.")
 
+    if args.add or args.remove:
+        manifest = load_manifest(args.root)
+        if manifest is None:
+            print("Cannot update the merged mod without a valid manifest, exiting...")
+            return
+        merge = manifest['merges'].get(relative_path(args.root, args.name))
+        if not merge or 'namespaces' not in merge:
+            print(f"No manifest record found for {args.name}, run a full merge first.")
+            return
+        if args.add and not add_to_merge(args, manifest, merge, args.add):
+            print(f"\nFailed to add {args.add}.")
+            return
+        if args.remove and not remove_from_merge(args, manifest, merge, args.remove):
+            print(f"\nFailed to remove namespace '{args.remove}'.")
+            return
+        print("\nAll operations completed successfully.")
+        return
+
+    if args.conflicts:
+        mods_root = args.mods_root or args.root
+        print(f"Checking for duplicate overrides in {mods_root}...")
+        if not report_duplicate_overrides(update_hash_index(mods_root, args.jobs)):
+            print(" -> No duplicate overrides found.")
+        return
+
     ini_files = collect_ini(args.root, args.name)
     if not ini_files:
         print("Found no .ini files to process. If you meant to re-enable files, use the -e flag.")
         return
 
+    # Load the manifest before the prompts, so a damaged one stops the merge before any questions are asked
+    manifest = load_manifest(args.root)
+    if manifest is None:
+        print("Run with the -e flag to re-enable the previous merge, or delete the damaged manifest, exiting...")
+        return
+
     print(f"Found {len(ini_files)} .ini file(s) to process:")
     for i, f in enumerate(ini_files):
         print(f"\t{i}: {f}")
 
+    # Read and pre-process all files in the background while the user answers the prompts
+    executor = ThreadPoolExecutor(max_workers=args.jobs)
+    prefetched = {ini_path: executor.submit(prepare_mod, ini_path, args.minify) for ini_path in ini_files}
+    if args.mods_root:
+        hash_index = executor.submit(update_hash_index, args.mods_root, args.jobs)
+    executor.shutdown(wait=False)
+
     print("\nPlease enter the order you want the script to merge the mods (e.g., 1 0 2). Press ENTER for default order:")
     ordered_files = get_user_order(ini_files)
 
-    print("\nProcessing files in the selected order...")
-
-    # Pre-read all files into memory as (path, content) tuples to avoid repeated IO
-    file_data = []
-    for ini_path in ordered_files:
-        print(f"Reading {ini_path}...")
-        content = safe_read_file(ini_path)
-        if not content:
-            print(f"Failed to read {ini_path}, exiting...")
-            return
-        file_data.append((ini_path, content))
-        print(f" -> Loaded {ini_path} into memory")
-
     # Extract default character name from first file
-    default_character_name = extract_character_name(ordered_files[0]) if ordered_files else ""
+    first_mod = prefetched[ordered_files[0]].result()
+    if not first_mod:
+        print(f"Failed to read {ordered_files[0]}, exiting...")
+        return
+    default_character_name = extract_character_name(first_mod['content'])
 
     # Ask for character name
     print(f"\nPlease enter the character name for the output files (default: '{default_character_name}'):")
@@ -382,25 +1237,59 @@ def main():
         else:
             args.back_key = ""
 
-    create_master_ini(file_data, args, character_name)
+    print("\nProcessing files in the selected order...")
 
-    # Write namespace ini files with hash removed
+    # Collect the prepared mods as (path, mod) tuples in the selected order
+    file_data = []
+    for ini_path in ordered_files:
+        mod = prefetched[ini_path].result()
+        if not mod:
+            print(f"Failed to read {ini_path}, exiting...")
+            return
+        file_data.append((ini_path, mod))
+        print(f" -> Loaded {ini_path} into memory")
+
+    if args.mods_root:
+        print(f"\nChecking for conflicts with other mods in {args.mods_root}...")
+        # The mods being merged and the previous master file are replaced by this merge
+        exclude = {relative_path(args.mods_root, path) for path in ordered_files + [args.name]}
+        if not report_merge_conflicts(hash_index.result(), file_data, exclude):
+            print(" -> No conflicts found.")
+
+    master_content = create_master_ini(file_data, args, character_name)
+    writes = [(args.name, master_content)]
+
+    # Build namespace ini files with hash removed
     print("\nWriting namespace .ini files...")
-    namespace_files = []
-    for i, (original_path, original_content) in enumerate(file_data):
+    namespace_files = {}
+    for i, (original_path, mod) in enumerate(file_data):
         namespace = str(i)
-        namespace_file = write_namespace_ini(original_content, namespace, original_path, character_name)
-        if namespace_file:
-            namespace_files.append(namespace_file)
+        output_path, processed_content = build_namespace_ini(mod, namespace, original_path, character_name)
+        writes.append((output_path, processed_content))
+        if args.minify:
+            disabled_name = None if args.store else get_disabled_path(original_path)
+            writes.append(build_source_map(mod, original_path, output_path, disabled_name))
+        namespace_files[namespace] = (original_path, output_path)
 
+    renames = []
     if not args.store:
         print("\nDisabling original .ini files...")
         for original_path, _ in file_data:  # Use tuple unpacking to get path
-            disabled_name = os.path.join(os.path.dirname(original_path), "DISABLED" + os.path.basename(original_path))
-            if safe_rename_file(original_path, disabled_name):
-                print(f" -> Disabled {original_path}")
-            else:
-                print(f"Failed to disable {original_path}")
+            disabled_name = get_disabled_path(original_path)
+            renames.append((original_path, disabled_name))
+
+    previous = manifest['merges'].get(relative_path(args.root, args.name))
+    merge = build_merge_record(args.root, character_name, get_merge_options(args), namespace_files, writes, renames, previous)
+    writes.append(update_manifest(args.root, manifest, args.name, merge))
+    if not commit_changes(args.root, writes, renames, args.jobs):
+        print("\nMerge was not completed.")
+        return
+
+    print(f"Master file '{args.name}' created successfully.")
+    for _, output_path in namespace_files.values():
+        print(f" -> Saved namespace file to {output_path}")
+    for original_path, _ in renames:
+        print(f" -> Disabled {original_path}")
 
     print("\nAll operations completed successfully.")
 